@@ -1,16 +1,21 @@
 import os
-import re
 import time
 import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from dotenv import load_dotenv
+from timeouts import TimeoutPolicy
+from resource_watchdog import ResourceWatchdog
+from run_report import save_run_report
+from perf_trace import PerformanceCapture
+from drafts import validate_draft
 import google.generativeai as genai
 import logging
 
@@ -22,7 +27,16 @@ logging.basicConfig(
 )
 
 class LinkedInBot:
-    def __init__(self):
+    def __init__(self, start_session=True):
+        self.driver = None
+        self.timeouts = TimeoutPolicy()
+        self.watchdog = ResourceWatchdog(self)
+        self.perf = PerformanceCapture(self)
+        if start_session:
+            self.start_session()
+
+    def start_session(self):
+        """Starts the browser and logs into LinkedIn."""
         self.driver = self.setup_driver()
         self.login()
 
@@ -39,6 +53,7 @@ class LinkedInBot:
         chrome_options.add_argument(
             "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
         )
+        self.perf.configure_options(chrome_options)
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.execute_script(
@@ -52,9 +67,13 @@ class LinkedInBot:
 
     def login(self):
         """Logs into LinkedIn using credentials from environment variables."""
-        self.driver.get("https://www.linkedin.com/login")
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.ID, "username"))
+        with self.perf.action("login_page"):
+            self.driver.get("https://www.linkedin.com/login")
+        self.timeouts.wait(
+            self.driver,
+            "login.username",
+            EC.presence_of_element_located((By.ID, "username")),
+            default=10,
         )
 
         username_field = self.driver.find_element(By.ID, "username")
@@ -76,8 +95,12 @@ class LinkedInBot:
 
         # Check for verification code input form
         try:
-            verification_form = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "email-pin-challenge"))
+            verification_form = self.timeouts.wait(
+                self.driver,
+                "login.verification_form",
+                EC.presence_of_element_located((By.ID, "email-pin-challenge")),
+                default=10,
+                optional=True,
             )
             logging.info("Verification code required. Prompting user for input.")
             verification_code = input("Enter the verification code sent to your email: ")
@@ -92,41 +115,20 @@ class LinkedInBot:
 
             # Wait for the process to complete and navigate to the feed section
             self.random_delay(10, 12)
-            self.driver.get("https://www.linkedin.com/feed/")
+            with self.perf.action("feed"):
+                self.driver.get("https://www.linkedin.com/feed/")
             logging.info("Logged in and navigated to the feed section.")
         except Exception as e:
             logging.info("Verification code not required or error occurred.")
             pass
 
-    def remove_markdown(self, text, ignore_hashtags=False):
-        """Removes markdown syntax from a given text string."""
-        patterns = [
-            r"(\*{1,2})(.*?)\1",  # Bold and italics
-            r"\[(.*?)\]\((.*?)\)",  # Links
-            r"`(.*?)`",  # Inline code
-            r"(\n\s*)- (.*)",  # Unordered lists (with `-`)
-            r"(\n\s*)\* (.*)",  # Unordered lists (with `*`)
-            r"(\n\s*)[0-9]+\. (.*)",  # Ordered lists
-            r"(#+)(.*)",  # Headings
-            r"(>+)(.*)",  # Blockquotes
-            r"(---|\*\*\*)",  # Horizontal rules
-            r"!\[(.*?)\]\((.*?)\)",  # Images
-        ]
-
-        # If ignoring hashtags, remove the heading pattern
-        if ignore_hashtags:
-            patterns.remove(r"(#+)(.*)")
-
-        # Replace markdown elements with an empty string
-        for pattern in patterns:
-            text = re.sub(
-                pattern, r" ", text
-            )  
-
-        return text.strip()
-
-    def generate_post_content(self, topic):
-        """Generates post content using Gemini AI based on the given topic."""
+    def generate_post_content(self, topic, cancel=None):
+        """
+        Generates post content using Gemini AI based on the given topic.
+
+        If `cancel` (a threading.Event) is set, no further drafts are requested and None
+        is returned; a Gemini call already in progress still runs to completion.
+        """
         logging.info(f"Generating post content for topic: {topic}")
         try:
             genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
@@ -141,13 +143,25 @@ class LinkedInBot:
                 }
             ]
 
-            post_response = client.generate_content(messages)
+            # Drafts are checked and repaired locally; only unrepairable ones cost another call
+            post_text = None
+            attempts = int(os.getenv("MAX_GENERATION_ATTEMPTS", 2))
+            for attempt in range(1, attempts + 1):
+                if cancel is not None and cancel.is_set():
+                    logging.info(f"Generation for '{topic}' cancelled before draft {attempt}.")
+                    return None
+                post_response = client.generate_content(messages)
+                check = validate_draft(post_response.text)
+                if check.issues:
+                    logging.info(
+                        f"Draft {attempt} of {attempts}: {', '.join(sorted(check.issues))}."
+                    )
+                if check.text:
+                    post_text = check.text
+                if not check.needs_regeneration:
+                    break
 
-            if post_response.text:
-                post_text = self.remove_markdown(
-                    post_response.text, ignore_hashtags=True
-                )
-            else:
+            if not post_text:
                 post_text = f"Excited to share some thoughts on {topic}! #technology #leadership"
         except Exception as e:
             logging.error("Failed to generate post content.", exc_info=True)
@@ -180,20 +194,32 @@ class LinkedInBot:
             # Close overlapping elements
             self.close_overlapping_elements()
 
-            # Wait for the "Start a post" button to be clickable and click it using JavaScript
-            start_post_button = WebDriverWait(self.driver, 20).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Start a post')]"))
-            )
+            with self.perf.action("composer_open"):
+                # Wait for the "Start a post" button to be clickable and click it using JavaScript
+                start_post_button = self.timeouts.wait(
+                    self.driver,
+                    "post.start_button",
+                    EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Start a post')]")),
+                    default=20,
+                )
 
-            self.driver.execute_script("arguments[0].click();", start_post_button)
+                self.driver.execute_script("arguments[0].click();", start_post_button)
 
-            # Wait a moment for animation or modal dialogs to appear
-            time.sleep(2)
+                # Wait a moment for animation or modal dialogs to appear
+                time.sleep(2)
 
-            # Assuming the text area for the post becomes visible after clicking the button:
-            post_text_area = WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_element_located((By.CSS_SELECTOR, "div[role='textbox']"))
-            )
+                # Assuming the text area for the post becomes visible after clicking the button:
+                post_text_area = self.timeouts.wait(
+                    self.driver,
+                    "post.text_area",
+                    EC.visibility_of_element_located((By.CSS_SELECTOR, "div[role='textbox']")),
+                    default=10,
+                )
+
+            # Content may still be generating in the background; this is the
+            # only point where the composer actually needs the text
+            if isinstance(post_text, Future):
+                post_text = post_text.result()
 
             # Click the text area to focus and start typing a post
             post_text_area.click()
@@ -201,16 +227,20 @@ class LinkedInBot:
                 "arguments[0].innerText = arguments[1];", post_text_area, post_text
             )
 
-            # Optionally, you can search for the 'Post' button and click it to publish
-            post_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//button[contains(@class, 'share-actions__primary-action')]",
-                    )
+            with self.perf.action("post_submit"):
+                # Optionally, you can search for the 'Post' button and click it to publish
+                post_button = self.timeouts.wait(
+                    self.driver,
+                    "post.submit_button",
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//button[contains(@class, 'share-actions__primary-action')]",
+                        )
+                    ),
+                    default=10,
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", post_button)
+                self.driver.execute_script("arguments[0].click();", post_button)
 
             logging.info("Post successful.")
             return True
@@ -218,32 +248,45 @@ class LinkedInBot:
             logging.error("Failed to post to LinkedIn.", exc_info=True)
             return False
 
+    def load_next_topic(self):
+        """Returns all lines of Topics.txt and the first topic, or None if there is nothing to post."""
+        with open("Topics.txt", "r") as file:
+            topics = file.readlines()
+
+        if not topics:
+            logging.info("No topics to process.")
+            return topics, None
+
+        # Get the first topic
+        topic = topics[0].strip()
+        if not topic:
+            logging.info("The first topic is empty.")
+            return topics, None
+
+        return topics, topic
+
+    def mark_topic_done(self, topics, topic):
+        """Moves a posted topic from Topics.txt to Topics_done.txt."""
+        with open("Topics_done.txt", "a") as done_file:
+            done_file.write(topic + "\n")
+        logging.info(f"Topic posted and saved to Topics_done.txt: {topic}")
+
+        # Remove the posted topic from Topics.txt
+        with open("Topics.txt", "w") as file:
+            file.writelines(topics[1:])
+        logging.info("First topic removed from Topics.txt.")
+
     def process_topics(self):
         """Processes the first topic from Topics.txt, posts it to LinkedIn, and updates the files accordingly."""
         try:
-            with open("Topics.txt", "r") as file:
-                topics = file.readlines()
-
-            if not topics:
-                logging.info("No topics to process.")
-                return
-
-            # Get the first topic
-            topic = topics[0].strip()
+            topics, topic = self.load_next_topic()
             if not topic:
-                logging.info("The first topic is empty.")
                 return
 
             post_text = self.generate_post_content(topic)
+            self.watchdog.checkpoint("before_post")
             if self.post_to_linkedin(post_text):
-                with open("Topics_done.txt", "a") as done_file:
-                    done_file.write(topic + "\n")
-                logging.info(f"Topic posted and saved to Topics_done.txt: {topic}")
-
-                # Remove the posted topic from Topics.txt
-                with open("Topics.txt", "w") as file:
-                    file.writelines(topics[1:])
-                logging.info("First topic removed from Topics.txt.")
+                self.mark_topic_done(topics, topic)
             else:
                 logging.info(f"Failed to post topic: {topic}")
             self.random_delay(5, 10)
@@ -251,14 +294,112 @@ class LinkedInBot:
         except Exception as e:
             logging.error("An error occurred while processing topics.", exc_info=True)
 
+    def process_topics_overlapped(self):
+        """
+        Like process_topics, but starts the browser session and content generation at the same time.
+
+        The bot must be created with start_session=False. Driver setup and login run on one
+        worker while Gemini generates the post on another; the two only meet inside
+        post_to_linkedin, right before the text is typed into the composer. If the session
+        fails, generation is abandoned: its result is discarded and it requests no further
+        drafts, but a Gemini call already in flight cannot be interrupted and is allowed to
+        finish (the interpreter waits for it at exit). If anything fails while the session
+        is still starting, the driver is quit as soon as it exists.
+
+        Returns:
+            A dict of stage timings in seconds, including the critical-path time saved
+            compared with running the same stages back to back.
+        """
+        timings = {}
+
+        def timed(name, func, *args):
+            start = time.monotonic()
+            try:
+                return func(*args)
+            finally:
+                timings[name] = time.monotonic() - start
+
+        def quit_when_started(future):
+            if self.driver is not None:
+                self.driver.quit()
+                logging.info("Driver started after the run was abandoned; quit it.")
+
+        try:
+            topics, topic = self.load_next_topic()
+        except Exception as e:
+            logging.error("An error occurred while processing topics.", exc_info=True)
+            return timings
+        if not topic:
+            return timings
+
+        run_start = time.monotonic()
+        cancel_generation = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=2)
+        session_future = executor.submit(timed, "session", self.start_session)
+        content_future = executor.submit(
+            timed, "generation", self.generate_post_content, topic, cancel_generation
+        )
+        try:
+            try:
+                session_future.result()
+            except Exception as e:
+                logging.error("Failed to start the browser session.", exc_info=True)
+                if not content_future.done():
+                    logging.info(
+                        "Abandoning content generation; any draft still in flight will be discarded."
+                    )
+                return timings
+
+            self.watchdog.checkpoint("before_post")
+            posted = self.post_to_linkedin(content_future)
+            # post_to_linkedin joined on content_future, unless it failed before that
+            if content_future.done() and "generation" in timings:
+                timings["critical_path"] = max(timings["session"], timings["generation"])
+                timings["saved"] = (
+                    timings["session"] + timings["generation"] - timings["critical_path"]
+                )
+                logging.info(
+                    f"Session ready in {timings['session']:.1f}s, content ready in "
+                    f"{timings['generation']:.1f}s; overlapping saved {timings['saved']:.1f}s "
+                    f"on the critical path."
+                )
+
+            if posted:
+                self.mark_topic_done(topics, topic)
+            else:
+                logging.info(f"Failed to post topic: {topic}")
+            timings["total"] = time.monotonic() - run_start
+            self.random_delay(5, 10)
+        except Exception as e:
+            logging.error("An error occurred while processing topics.", exc_info=True)
+        finally:
+            # Stops generation between drafts if nothing is waiting for it any more
+            cancel_generation.set()
+            if not session_future.done():
+                session_future.add_done_callback(quit_when_started)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return timings
+
 if __name__ == "__main__":
-    bot = LinkedInBot()
+    bot = LinkedInBot(start_session=False)
+    timings = {}
     try:
-        bot.process_topics()
+        timings = bot.process_topics_overlapped()
+        bot.watchdog.checkpoint("after_post", recycle=False)
         time.sleep(5)
     finally:
-        bot.driver.quit()
-        logging.info("Driver session ended cleanly.")
+        bot.timeouts.save()
+        save_run_report(
+            {
+                "timings": timings,
+                "memory": bot.watchdog.timeline,
+                "trace": bot.perf.save(),
+            }
+        )
+        if bot.driver is not None:
+            bot.driver.quit()
+            logging.info("Driver session ended cleanly.")
 
 # import os
 # import re
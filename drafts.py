@@ -0,0 +1,200 @@
+import re
+import sys
+import json
+import time
+import argparse
+from collections import Counter, namedtuple
+from multiprocessing import Pool
+
+MAX_POST_LENGTH = 3000  # LinkedIn's limit for a post
+MIN_POST_LENGTH = 1000  # What the generation prompt asks for
+
+# Every markdown construct we clean up, as one alternation so a draft is scanned once.
+# The leading lookahead rejects ordinary characters before any branch is tried. Order
+# matters: images before links, bold before single-asterisk emphasis.
+# Bold markers are only removed as a pair around non-space text that is not glued to a
+# word, so "2**10" survives; "__" pairs must also enclose a space, so "__init__" does too.
+# A ">" before a number ("> 50% growth") means "more than", not a quote.
+MARKDOWN = re.compile(
+    r"(?=[#*_>+!\[`-]|^)(?:"
+    r"(?P<heading>^[ \t]*#{1,6}[ \t]+)"
+    r"|(?P<rule>^[ \t]*(?:-{3,}|\*{3,}|_{3,})[ \t]*$)"
+    r"|(?P<quote>^[ \t]*>+(?![ \t]*[\d$€£.+-])[ \t]?)"
+    r"|(?P<bullet>^[ \t]*[*+][ \t]+)"
+    r"|(?P<image>!\[[^\]\n]*\]\([^)\n]*\))"
+    r"|(?P<link>\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>[^)\n]+)\))"
+    r"|(?P<code>`+)"
+    r"|(?P<bold>(?<!\w)\*\*(?=\S)(?P<bold_text>[^\n]+?)(?<=\S)\*\*(?!\w))"
+    r"|(?P<underline>(?<!\w)__(?=\S)(?P<underline_text>[^\n]*?\s[^\n]*?)(?<=\S)__(?!\w))"
+    r"|(?P<emphasis>(?<![\w*])\*(?=\S)|(?<=\S)\*(?![\w*])))",
+    re.MULTILINE,
+)
+BLANK_LINES = re.compile(r"\n{3,}")
+TRAILING_HASHTAGS = re.compile(r"(?:\s*#\w+)+\s*$")
+HASHTAG_TAIL = 1000  # Only the end of a draft is searched for its hashtag block
+HASHTAG = re.compile(r"(?<![\w#])#\w")
+SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+DraftCheck = namedtuple("DraftCheck", ["text", "issues", "needs_regeneration"])
+
+
+def _clean_markdown(text, issues):
+    def replace(match):
+        kind = match.lastgroup
+        if kind == "underline":
+            kind = "bold"
+        issues.add(f"markdown_{kind}")
+        if kind == "link":
+            return f"{match.group('link_text')} ({match.group('link_url')})"
+        if kind == "bold":
+            return match.group("bold_text") or match.group("underline_text")
+        if kind == "bullet":
+            return match.group(0).replace(match.group(0).strip(), "-", 1)
+        return ""
+
+    text = MARKDOWN.sub(replace, text)
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return BLANK_LINES.sub("\n\n", text)
+
+
+def _trim(text, limit):
+    """Cuts text to at most `limit` characters at a sentence end, keeping trailing hashtags."""
+    hashtags = TRAILING_HASHTAGS.search(text, max(0, len(text) - HASHTAG_TAIL))
+    tags = hashtags.group(0).strip() if hashtags else ""
+    body = text[: hashtags.start()] if hashtags else text
+    room = limit - (len(tags) + 2 if tags else 0)
+
+    cut = None
+    if len(body) <= room:
+        cut = len(body)
+    else:
+        # Search one character past the window so the lookahead sees what follows a
+        # period at its edge ("3.14" must not end a sentence at "3."), then drop any
+        # match that ends outside the window
+        for match in SENTENCE_END.finditer(body, 0, room + 1):
+            if match.end() <= room:
+                cut = match.end()
+    if cut is None:
+        # No sentence ends in range; fall back to the last whole word
+        cut = body.rfind(" ", 0, room)
+    if cut <= 0:
+        return None
+
+    body = body[:cut].rstrip()
+    return f"{body}\n\n{tags}" if tags else body
+
+
+def validate_draft(text, min_length=MIN_POST_LENGTH, max_length=MAX_POST_LENGTH):
+    """
+    Checks a generated draft and repairs what can be fixed without the model.
+
+    Leftover markdown is removed (link text and URLs are kept), blank lines are
+    collapsed, and drafts over `max_length` are trimmed at the last sentence that fits,
+    keeping the trailing hashtags. Drafts that are empty or shorter than `min_length`
+    cannot be repaired locally and are marked for regeneration.
+
+    Args:
+        text: The draft as returned by the model.
+        min_length: Minimum acceptable length after repair.
+        max_length: Maximum post length.
+
+    Returns:
+        A DraftCheck of the repaired text, the set of issues found, and whether the
+        draft should be regenerated.
+    """
+    issues = set()
+    text = _clean_markdown(text or "", issues).strip()
+
+    if not text:
+        issues.add("empty")
+        return DraftCheck(text, issues, True)
+
+    if len(text) > max_length:
+        issues.add("too_long")
+        trimmed = _trim(text, max_length)
+        if trimmed is None:
+            return DraftCheck(text, issues, True)
+        text = trimmed
+
+    if len(text) < min_length:
+        issues.add("too_short")
+        return DraftCheck(text, issues, True)
+
+    if not HASHTAG.search(text):
+        issues.add("no_hashtags")
+    return DraftCheck(text, issues, False)
+
+
+def _validate_line(line):
+    try:
+        draft = json.loads(line)
+    except ValueError:
+        draft = None
+    # Bad lines are passed through and flagged, so one of them cannot stop a bulk run
+    if not isinstance(draft, dict) or not isinstance(draft.get("text", ""), str):
+        return {"line": line.rstrip("\n"), "issues": ["invalid"], "needs_regeneration": True}
+
+    check = validate_draft(draft.get("text"))
+    draft["text"] = check.text
+    draft["issues"] = sorted(check.issues)
+    draft["needs_regeneration"] = check.needs_regeneration
+    return draft
+
+
+def validate_backlog(in_path, out_path, workers=1, chunksize=256):
+    """
+    Validates and repairs a JSON Lines backlog of drafts, one {"text": ...} object per line.
+
+    Other fields on each line are passed through. A line that is not a JSON object with
+    a string `text` is written back as {"line": ...} with an "invalid" issue and marked
+    for regeneration. Lines are streamed, so memory use does not grow with the backlog;
+    with workers > 1 they are spread over processes.
+
+    Returns:
+        A Counter with the total number of drafts, how many need regeneration, and
+        how often each issue was seen.
+    """
+    totals = Counter()
+    with open(in_path, "r") as source, open(out_path, "w") as target:
+        lines = (line for line in source if line.strip())
+        if workers > 1:
+            pool = Pool(workers)
+            results = pool.imap(_validate_line, lines, chunksize)
+        else:
+            pool = None
+            results = map(_validate_line, lines)
+        try:
+            for draft in results:
+                target.write(json.dumps(draft) + "\n")
+                totals["drafts"] += 1
+                totals["needs_regeneration"] += draft["needs_regeneration"]
+                totals.update(draft["issues"])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and repair a backlog of post drafts.")
+    parser.add_argument("backlog", help="JSON Lines file with a 'text' field per draft.")
+    parser.add_argument("-o", "--output", required=True, help="Where to write the checked drafts.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to use (default: 1).")
+    args = parser.parse_args(argv)
+
+    start = time.monotonic()
+    totals = validate_backlog(args.backlog, args.output, args.workers)
+    elapsed = time.monotonic() - start
+
+    drafts = totals.pop("drafts", 0)
+    regenerate = totals.pop("needs_regeneration", 0)
+    rate = drafts / elapsed if elapsed else 0
+    print(f"{drafts} drafts checked in {elapsed:.2f}s ({rate:.0f}/s); {regenerate} need regeneration.")
+    for issue, count in totals.most_common():
+        print(f"  {issue:<20} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import math
+import glob
+import time
+import logging
+import argparse
+import statistics
+from contextlib import contextmanager
+
+# Installed on every new document so long tasks can be read back after an action
+LONG_TASK_OBSERVER = """
+window.__perfLongTasks = [];
+try {
+    new PerformanceObserver(function (list) {
+        list.getEntries().forEach(function (entry) {
+            window.__perfLongTasks.push(entry.duration);
+        });
+    }).observe({entryTypes: ["longtask"]});
+} catch (e) {}
+"""
+
+READ_PAGE_TIMING = """
+var nav = performance.getEntriesByType("navigation")[0];
+var tasks = window.__perfLongTasks || [];
+window.__perfLongTasks = [];
+return {
+    origin: performance.timeOrigin,
+    dcl: nav ? nav.domContentLoadedEventEnd : null,
+    load: nav ? nav.loadEventEnd : null,
+    long_tasks: tasks
+};
+"""
+
+# CDP Performance.getMetrics counters (cumulative seconds) reported per action, in ms
+DURATION_METRICS = {
+    "ScriptDuration": "script_ms",
+    "LayoutDuration": "layout_ms",
+    "RecalcStyleDuration": "style_ms",
+    "TaskDuration": "task_ms",
+}
+
+# Fields compared across runs by the summary command
+COMPARED_FIELDS = ["wall_s", "bytes", "requests", "dcl_ms", "load_ms", "long_task_ms", "script_ms"]
+
+
+def enable_performance_log(chrome_options):
+    """Asks chromedriver to buffer Network and Page events for PerformanceCapture."""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+class PerformanceCapture:
+    """
+    Opt-in record of what Chrome does during each navigation and key action.
+
+    Enabled with PERF_TRACE=1. Wrap an action in `with capture.action("feed"):` to
+    record its wall time, bytes transferred and request count (from chromedriver's
+    performance log), DOMContentLoaded and load timing if the action loaded a new
+    document, long tasks, and scripting/layout/style time from CDP Performance.getMetrics.
+    `save()` writes all actions of the run to one compact JSON file in PERF_TRACE_DIR.
+    When disabled, `action()` does nothing.
+    """
+
+    def __init__(self, bot, enabled=None):
+        self.bot = bot
+        if enabled is None:
+            enabled = os.getenv("PERF_TRACE", "").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.actions = []
+        self._prepared_target = None
+
+    def configure_options(self, chrome_options):
+        """Adds the logging capability the capture needs; call from setup_driver."""
+        if self.enabled:
+            enable_performance_log(chrome_options)
+
+    def _prepare(self, driver):
+        # CDP domains and new-document scripts are per tab, so a recycled tab is prepared again
+        target = (driver, driver.current_window_handle)
+        if self._prepared_target == target:
+            return
+        driver.execute_cdp_cmd("Performance.enable", {})
+        driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": LONG_TASK_OBSERVER}
+        )
+        driver.execute_script(LONG_TASK_OBSERVER)
+        self._prepared_target = target
+
+    def _metrics(self, driver):
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        return {metric["name"]: metric["value"] for metric in metrics}
+
+    def _network(self, driver):
+        requests = 0
+        transferred = 0
+        for entry in driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            if message["method"] == "Network.requestWillBeSent":
+                requests += 1
+            elif message["method"] == "Network.loadingFinished":
+                transferred += message["params"].get("encodedDataLength", 0)
+        return requests, transferred
+
+    @contextmanager
+    def action(self, label):
+        """Records the wrapped navigation or action under `label`."""
+        if not self.enabled or self.bot.driver is None:
+            yield
+            return
+
+        driver = self.bot.driver
+        try:
+            self._prepare(driver)
+            before = self._metrics(driver)
+            origin = driver.execute_script(READ_PAGE_TIMING)["origin"]
+            # Drop events from before the action
+            driver.get_log("performance")
+        except Exception as e:
+            logging.info(f"Performance capture unavailable for {label}.")
+            before = None
+
+        if before is None:
+            yield
+            return
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            wall = time.monotonic() - start
+            try:
+                self._record(label, wall, before, origin)
+            except Exception as e:
+                logging.info(f"Failed to record performance for {label}.")
+
+    def _record(self, label, wall, before, origin):
+        driver = self.bot.driver
+        after = self._metrics(driver)
+        requests, transferred = self._network(driver)
+        page = driver.execute_script(READ_PAGE_TIMING)
+
+        entry = {
+            "label": label,
+            "wall_s": round(wall, 3),
+            "bytes": transferred,
+            "requests": requests,
+            "dcl_ms": None,
+            "load_ms": None,
+            "long_tasks": len(page["long_tasks"]),
+            "long_task_ms": round(sum(page["long_tasks"]), 1),
+        }
+        # Navigation timing only describes this action if it loaded a new document
+        if page["origin"] != origin:
+            if page["dcl"]:
+                entry["dcl_ms"] = round(page["dcl"], 1)
+            if page["load"]:
+                entry["load_ms"] = round(page["load"], 1)
+        for metric, field in DURATION_METRICS.items():
+            entry[field] = round((after.get(metric, 0) - before.get(metric, 0)) * 1000, 1)
+        self.actions.append(entry)
+
+    def save(self, directory=None):
+        """Writes this run's trace; returns its path, or None if nothing was captured."""
+        if not self.actions:
+            return None
+        directory = directory or os.getenv("PERF_TRACE_DIR", "traces")
+        path = os.path.join(directory, f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w") as file:
+                json.dump(
+                    {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "actions": self.actions},
+                    file,
+                    separators=(",", ":"),
+                )
+            logging.info(f"Performance trace saved to {path}.")
+            return path
+        except Exception as e:
+            logging.error("Failed to save the performance trace.", exc_info=True)
+            return None
+
+
+def load_traces(paths):
+    """Loads trace files, oldest run first."""
+    traces = []
+    for path in paths:
+        with open(path, "r") as file:
+            trace = json.load(file)
+        trace["path"] = path
+        traces.append(trace)
+    return sorted(traces, key=lambda trace: trace["run"])
+
+
+def summarize_trace(trace):
+    """Reduces a trace to the median of each (label, field) over that run's actions."""
+    values = {}
+    for action in trace["actions"]:
+        for field in COMPARED_FIELDS:
+            if action.get(field) is not None:
+                values.setdefault((action["label"], field), []).append(action[field])
+    return {key: statistics.median(samples) for key, samples in values.items()}
+
+
+def compare_traces(traces, threshold=0.2):
+    """
+    Compares the latest run against earlier ones, one row per action label and field.
+
+    Actions repeated within a run (e.g. every refresh_page) are first reduced to that
+    run's median, so each run counts once. The baseline is the median of the earlier
+    runs' values.
+
+    Returns:
+        Rows of (label, field, baseline, latest, change, regressed), where change is a
+        fraction (infinite when a zero baseline became non-zero) and regressed is True if
+        latest exceeds the baseline by more than threshold.
+    """
+    if len(traces) < 2:
+        return []
+
+    history = {}
+    for trace in traces[:-1]:
+        for key, value in summarize_trace(trace).items():
+            history.setdefault(key, []).append(value)
+
+    rows = []
+    for (label, field), latest in summarize_trace(traces[-1]).items():
+        values = history.get((label, field))
+        if not values:
+            continue
+        baseline = statistics.median(values)
+        if baseline:
+            change = (latest - baseline) / baseline
+        else:
+            # Zero is the normal value for e.g. long_task_ms, so anything above it counts
+            change = math.inf if latest > 0 else 0.0
+        rows.append((label, field, baseline, latest, change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the latest performance trace with earlier runs."
+    )
+    parser.add_argument(
+        "traces",
+        nargs="*",
+        help="Trace files to compare (default: every trace in PERF_TRACE_DIR).",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Flag increases larger than this fraction of the baseline (default: 0.2).",
+    )
+    args = parser.parse_args(argv)
+
+    paths = args.traces or glob.glob(
+        os.path.join(os.getenv("PERF_TRACE_DIR", "traces"), "trace-*.json")
+    )
+    traces = load_traces(paths)
+    if len(traces) < 2:
+        print("Need at least two traces to compare.")
+        return 1
+
+    rows = compare_traces(traces, args.threshold)
+    print(f"Latest run {traces[-1]['run']} against the median of {len(traces) - 1} earlier run(s)\n")
+    print(f"{'action':<16} {'field':<14} {'baseline':>12} {'latest':>12} {'change':>8}")
+    regressions = 0
+    for label, field, baseline, latest, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        change = "new" if math.isinf(change) else f"{change:+.0%}"
+        print(f"{label:<16} {field:<14} {baseline:>12g} {latest:>12g} {change:>8}{flag}")
+        regressions += regressed
+    return 2 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
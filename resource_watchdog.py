@@ -0,0 +1,265 @@
+import os
+import time
+import logging
+
+
+class ResourceWatchdog:
+    """
+    Keeps the browser's memory in check during long sessions.
+
+    At each checkpoint, which the bot calls between actions, the watchdog samples the
+    resident memory of the chromedriver/Chrome process tree and the page's JS heap.
+    If the JS heap is over its limit, the tab is replaced with a fresh one. If the
+    process tree's RSS is over its limit, the whole driver is restarted. In both cases
+    the current URL and scroll position are restored, and a restarted driver also gets
+    the old cookies back so the LinkedIn session survives. Every sample is kept in
+    `timeline` for the run report.
+
+    Memory is sampled again right after each recycle. A page can be over the limit as
+    soon as it loads, so the limit that triggered the recycle is raised to
+    `headroom` times that fresh baseline if the baseline is higher. After any recycle
+    attempt, further recycles also wait for `cooldown_s` seconds.
+    """
+
+    def __init__(
+        self, bot, rss_limit_mb=None, js_heap_limit_mb=None, cooldown_s=None, headroom=1.5
+    ):
+        self.bot = bot
+        if rss_limit_mb is None:
+            rss_limit_mb = os.getenv("WATCHDOG_RSS_LIMIT_MB", 1024)
+        if js_heap_limit_mb is None:
+            js_heap_limit_mb = os.getenv("WATCHDOG_JS_HEAP_LIMIT_MB", 256)
+        if cooldown_s is None:
+            cooldown_s = os.getenv("WATCHDOG_COOLDOWN_S", 300)
+        self.rss_limit_mb = float(rss_limit_mb)
+        self.js_heap_limit_mb = float(js_heap_limit_mb)
+        self.cooldown_s = float(cooldown_s)
+        self.headroom = headroom
+        # Effective limits, raised above the configured ones by post-recycle baselines
+        self._rss_limit_mb = self.rss_limit_mb
+        self._js_heap_limit_mb = self.js_heap_limit_mb
+        self._quiet_until = 0.0
+        self.timeline = []
+        self._start = time.monotonic()
+        self._metrics_target = None
+
+    def process_tree_rss_mb(self):
+        """Returns the summed RSS of chromedriver and all its descendants, or None if unknown."""
+        try:
+            root = self.bot.driver.service.process.pid
+        except Exception:
+            return None
+
+        # Map each parent pid to its children in one pass over /proc
+        children = {}
+        try:
+            pids = [name for name in os.listdir("/proc") if name.isdigit()]
+        except OSError:
+            return None
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat", "r") as file:
+                    # The command name may contain spaces, so split after its closing paren
+                    fields = file.read().rsplit(")", 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            children.setdefault(int(fields[1]), []).append(int(pid))
+
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        total = 0
+        pending = [root]
+        while pending:
+            pid = pending.pop()
+            pending.extend(children.get(pid, []))
+            try:
+                with open(f"/proc/{pid}/statm", "r") as file:
+                    total += int(file.read().split()[1]) * page_size
+            except (OSError, IndexError, ValueError):
+                continue
+        return total / (1024 * 1024)
+
+    def js_heap_mb(self):
+        """Returns the current page's used JS heap via CDP Performance.getMetrics, or None."""
+        driver = self.bot.driver
+        try:
+            # CDP domains are enabled per tab, so a recycled tab needs enabling again
+            target = (driver, driver.current_window_handle)
+            if self._metrics_target != target:
+                driver.execute_cdp_cmd("Performance.enable", {})
+                self._metrics_target = target
+            metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        except Exception:
+            return None
+        for metric in metrics:
+            if metric["name"] == "JSHeapUsedSize":
+                return metric["value"] / (1024 * 1024)
+        return None
+
+    def checkpoint(self, label, recycle=True):
+        """
+        Samples memory and recycles the tab or driver if a limit is crossed.
+
+        Only call this between actions, when no element references are held.
+
+        Args:
+            label: Short description of where the checkpoint is, stored in the timeline.
+            recycle: Set to False to only record a sample, e.g. right before quitting.
+
+        Returns:
+            "driver" or "tab" if something was recycled, otherwise None.
+        """
+        if self.bot.driver is None:
+            return None
+
+        rss = self.process_tree_rss_mb()
+        heap = self.js_heap_mb()
+        action = None
+        if not recycle or time.monotonic() < self._quiet_until:
+            pass
+        elif rss is not None and rss > self._rss_limit_mb:
+            logging.warning(
+                f"Chrome RSS is {rss:.0f} MB (limit {self._rss_limit_mb:.0f} MB); restarting the driver."
+            )
+            action = "driver"
+        elif heap is not None and heap > self._js_heap_limit_mb:
+            logging.warning(
+                f"JS heap is {heap:.0f} MB (limit {self._js_heap_limit_mb:.0f} MB); replacing the tab."
+            )
+            action = "tab"
+
+        if action is None:
+            self._record(label, rss, heap, None)
+            return None
+
+        recycled = self.recycle_driver() if action == "driver" else self.recycle_tab()
+        self._quiet_until = time.monotonic() + self.cooldown_s
+        self._record(label, rss, heap, action if recycled else f"{action} failed")
+        if not recycled or self.bot.driver is None:
+            return None
+
+        # Re-sample the fresh page and keep the limits above its baseline
+        rss = self.process_tree_rss_mb()
+        heap = self.js_heap_mb()
+        self._record(f"{label} (after recycle)", rss, heap, None)
+        if action == "driver":
+            # A new browser starts from scratch, so drop limits raised for the old one
+            self._rss_limit_mb = self.rss_limit_mb
+            self._js_heap_limit_mb = self.js_heap_limit_mb
+            if rss is not None:
+                self._rss_limit_mb = max(self._rss_limit_mb, rss * self.headroom)
+        if heap is not None:
+            self._js_heap_limit_mb = max(self._js_heap_limit_mb, heap * self.headroom)
+        return action
+
+    def _record(self, label, rss, heap, action):
+        self.timeline.append(
+            {
+                "t": round(time.monotonic() - self._start, 2),
+                "label": label,
+                "rss_mb": round(rss, 1) if rss is not None else None,
+                "js_heap_mb": round(heap, 1) if heap is not None else None,
+                "recycled": action,
+            }
+        )
+
+    def _page_state(self):
+        driver = self.bot.driver
+        return {
+            "url": driver.current_url,
+            "scroll_y": driver.execute_script("return window.scrollY;"),
+        }
+
+    def _restore_page(self, state):
+        driver = self.bot.driver
+        driver.get(state["url"])
+        self.bot.random_delay(2, 4)
+        driver.execute_script("window.scrollTo(0, arguments[0]);", state["scroll_y"])
+
+    def recycle_tab(self):
+        """Replaces the current tab with a fresh one showing the same page."""
+        driver = self.bot.driver
+        try:
+            state = self._page_state()
+            old_handle = driver.current_window_handle
+            driver.switch_to.new_window("tab")
+            new_handle = driver.current_window_handle
+
+            # Close the old tab first so its renderer is released before the page reloads
+            driver.switch_to.window(old_handle)
+            driver.close()
+            driver.switch_to.window(new_handle)
+            self._restore_page(state)
+            logging.info("Tab recycled.")
+            return True
+        except Exception as e:
+            logging.error("Failed to recycle the tab.", exc_info=True)
+            return False
+
+    def _logged_in(self):
+        """True if the current driver holds a LinkedIn session and is not on a login wall."""
+        driver = self.bot.driver
+        if driver.get_cookie("li_at") is None:
+            return False
+        url = driver.current_url
+        return not any(wall in url for wall in ("/login", "/authwall", "/checkpoint"))
+
+    def _restore_session(self, cookies, state):
+        """Puts the old cookies into the new driver and reopens the page; True if still logged in."""
+        try:
+            # Cookies can only be set for the domain that is currently loaded
+            self.bot.driver.get("https://www.linkedin.com/")
+            for cookie in cookies:
+                try:
+                    self.bot.driver.add_cookie(cookie)
+                except Exception:
+                    logging.info(f"Skipped cookie {cookie.get('name')} while restoring the session.")
+            self._restore_page(state)
+            return self._logged_in()
+        except Exception as e:
+            logging.error("Failed to restore the session from cookies.", exc_info=True)
+            return False
+
+    def recycle_driver(self):
+        """
+        Restarts Chrome and restores the LinkedIn session, from cookies or by logging in again.
+
+        Returns:
+            True if the new driver is logged in and back on the same page. False if the
+            old driver is still in use, the new one is logged out, or no driver could be
+            started, in which case bot.driver is None.
+        """
+        try:
+            state = self._page_state()
+            cookies = self.bot.driver.get_cookies()
+        except Exception as e:
+            logging.error("Failed to save the session before restarting the driver.", exc_info=True)
+            return False
+
+        try:
+            self.bot.driver.quit()
+        except Exception as e:
+            logging.info("Old driver did not quit cleanly.")
+
+        try:
+            self.bot.driver = self.bot.setup_driver()
+        except Exception as e:
+            logging.error("Failed to start a new driver; no browser session is left.", exc_info=True)
+            self.bot.driver = None
+            return False
+
+        if self._restore_session(cookies, state):
+            logging.info("Driver recycled and session restored.")
+            return True
+
+        logging.warning("Cookies did not restore the session; logging in again.")
+        try:
+            self.bot.login()
+            self._restore_page(state)
+            if self._logged_in():
+                logging.info("Driver recycled and logged in again.")
+                return True
+        except Exception as e:
+            logging.error("Failed to log in again after restarting the driver.", exc_info=True)
+            return False
+        logging.error("Logging in again did not restore the session.")
+        return False
@@ -0,0 +1,28 @@
+import os
+import json
+import time
+import logging
+
+
+def save_run_report(report, directory=None):
+    """
+    Writes a run's report as JSON to RUN_REPORT_DIR (default "reports").
+
+    Args:
+        report: A JSON-serialisable dict describing the run.
+        directory: Overrides RUN_REPORT_DIR.
+
+    Returns:
+        The path of the written file, or None if it could not be written.
+    """
+    directory = directory or os.getenv("RUN_REPORT_DIR", "reports")
+    path = os.path.join(directory, f"run-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+        logging.info(f"Run report saved to {path}.")
+        return path
+    except Exception as e:
+        logging.error("Failed to save the run report.", exc_info=True)
+        return None
@@ -0,0 +1,209 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+
+class TimeoutPolicy:
+    """
+    Chooses WebDriverWait timeouts from latencies observed on previous runs.
+
+    Every wait is identified by a key such as "comment.submit_button". The part before
+    the first dot is the stage; latencies are kept both per key and per stage, as
+    histograms with fixed-width buckets, in a small JSON file. A wait's deadline is the
+    observed high percentile times a margin, clamped between a floor and a ceiling.
+    Keys with too few samples use the caller's default. Stage histograms are not used
+    for deadlines, since elements within a stage can differ by an order of magnitude;
+    they show where a run spends its time (`python timeouts.py`).
+
+    A wait that times out is recorded as a censored sample at the deadline it used,
+    capped at the caller's default: the element took at least that long. Timeouts alone
+    can therefore raise a deadline back up to the default, never past it. Only real
+    successful latencies (the largest one seen is kept per key) can take it higher.
+    After `backoff_after` consecutive timeouts on a key, the wait uses exactly the
+    default until it succeeds. A missing element never costs more than the old fixed
+    timeout did.
+
+    Probes that are expected to time out in normal use, such as an optional challenge
+    form, pass `optional=True` and always wait exactly their default.
+    """
+
+    BUCKET_WIDTH = 0.25  # seconds
+
+    def __init__(
+        self,
+        path=None,
+        floor=None,
+        ceiling=None,
+        percentile=None,
+        margin=None,
+        min_samples=5,
+        max_samples=500,
+        backoff_after=None,
+    ):
+        self.path = path or os.getenv("WAIT_STATS_FILE", ".wait_stats.json")
+        if floor is None:
+            floor = os.getenv("WAIT_TIMEOUT_FLOOR", 3)
+        if ceiling is None:
+            ceiling = os.getenv("WAIT_TIMEOUT_CEILING", 30)
+        if percentile is None:
+            percentile = os.getenv("WAIT_TIMEOUT_PERCENTILE", 0.95)
+        if margin is None:
+            margin = os.getenv("WAIT_TIMEOUT_MARGIN", 1.5)
+        self.floor = float(floor)
+        self.ceiling = float(ceiling)
+        self.percentile = float(percentile)
+        self.margin = float(margin)
+        if backoff_after is None:
+            backoff_after = os.getenv("WAIT_TIMEOUT_BACKOFF_AFTER", 3)
+        self.backoff_after = int(backoff_after)
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.stats = self.load()
+
+    def load(self):
+        """Reads stored histograms, starting empty if the file is missing or unreadable."""
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable wait statistics in {self.path}.")
+            return {}
+
+    def save(self):
+        """Writes the histograms back to disk."""
+        with self._lock:
+            data = json.dumps(self.stats, sort_keys=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                file.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error("Failed to save wait statistics.", exc_info=True)
+
+    def _entry(self, key):
+        entry = self.stats.setdefault(key, {"buckets": {}, "count": 0, "timeouts": 0})
+        # Statistics files written before streaks were tracked lack the field
+        entry.setdefault("streak", 0)
+        return entry
+
+    def _add_sample(self, key, elapsed):
+        entry = self._entry(key)
+        bucket = str(int(elapsed / self.BUCKET_WIDTH))
+        entry["buckets"][bucket] = entry["buckets"].get(bucket, 0) + 1
+        entry["count"] += 1
+
+        # Halve old counts once the histogram is full so it follows recent behaviour
+        if entry["count"] > self.max_samples:
+            buckets = {}
+            for name, count in entry["buckets"].items():
+                if count // 2:
+                    buckets[name] = count // 2
+            entry["buckets"] = buckets
+            entry["count"] = sum(buckets.values())
+
+    def record(self, key, elapsed):
+        """Records how long a successful wait for `key` took."""
+        stage = key.split(".", 1)[0]
+        with self._lock:
+            self._add_sample(key, elapsed)
+            entry = self._entry(key)
+            entry["streak"] = 0
+            entry["max_ok"] = max(entry.get("max_ok", 0), elapsed)
+            if stage != key:
+                self._add_sample(stage, elapsed)
+
+    def record_timeout(self, key, timeout, default):
+        """Records a wait for `key` that hit its `timeout` as a sample of at least that long."""
+        with self._lock:
+            entry = self._entry(key)
+            entry["timeouts"] += 1
+            entry["streak"] += 1
+            # One bucket above the deadline so the percentile can move past it, but never
+            # beyond the default: a timeout cannot tell a slow page from a missing element
+            self._add_sample(key, min(timeout + self.BUCKET_WIDTH, default))
+
+    def _quantile(self, key):
+        entry = self.stats.get(key)
+        if not entry or entry["count"] < self.min_samples:
+            return None
+
+        wanted = math.ceil(entry["count"] * self.percentile)
+        seen = 0
+        for bucket in sorted(entry["buckets"], key=int):
+            seen += entry["buckets"][bucket]
+            if seen >= wanted:
+                # Upper edge of the bucket, so the estimate never undershoots
+                return (int(bucket) + 1) * self.BUCKET_WIDTH
+        return None
+
+    def timeout_for(self, key, default):
+        """Returns the deadline in seconds for a wait identified by `key`."""
+        with self._lock:
+            observed = self._quantile(key)
+            entry = self.stats.get(key, {})
+            streak = entry.get("streak", 0)
+            max_ok = entry.get("max_ok", 0)
+
+        if observed is None or streak >= self.backoff_after:
+            timeout = default
+        else:
+            # Above the default only as far as real successful waits justify
+            timeout = min(observed * self.margin, max(default, max_ok * self.margin))
+        return min(max(timeout, self.floor), self.ceiling)
+
+    def wait(self, driver, key, condition, default, optional=False):
+        """
+        Runs WebDriverWait(driver, timeout).until(condition) with an adaptive timeout.
+
+        Args:
+            driver: The WebDriver to wait on.
+            key: Stable name for this wait, "<stage>.<element>".
+            condition: An expected condition, e.g. EC.element_to_be_clickable(locator).
+            default: Timeout to use until enough latencies have been observed.
+            optional: The element is often legitimately absent. The wait always uses
+                `default` and timeouts are not recorded.
+
+        Returns:
+            Whatever the condition returns.
+
+        Raises:
+            TimeoutException: If the condition is not met before the deadline.
+        """
+        timeout = default if optional else self.timeout_for(key, default)
+        start = time.monotonic()
+        try:
+            result = WebDriverWait(driver, timeout).until(condition)
+        except TimeoutException:
+            if not optional:
+                self.record_timeout(key, timeout, default)
+            raise
+        self.record(key, time.monotonic() - start)
+        return result
+
+    def summary(self):
+        """Returns (key, samples, timeouts, high percentile) rows for every stored key."""
+        rows = []
+        with self._lock:
+            for key in sorted(self.stats):
+                entry = self.stats[key]
+                rows.append(
+                    (key, entry["count"], entry["timeouts"], self._quantile(key))
+                )
+        return rows
+
+
+if __name__ == "__main__":
+    policy = TimeoutPolicy()
+    print(f"{'wait':<40} {'samples':>8} {'timeouts':>9} {'p' + str(int(policy.percentile * 100)):>7}")
+    for key, count, timeouts, observed in policy.summary():
+        observed = f"{observed:.2f}s" if observed is not None else "-"
+        print(f"{key:<40} {count:>8} {timeouts:>9} {observed:>7}")
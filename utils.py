@@ -8,9 +8,12 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from dotenv import load_dotenv
+from timeouts import TimeoutPolicy
+from resource_watchdog import ResourceWatchdog
+from run_report import save_run_report
+from perf_trace import PerformanceCapture
 from bs4 import BeautifulSoup
 import google.generativeai as genai
 import logging
@@ -87,6 +90,9 @@ class LinkedInBot:
     """
 
     def __init__(self):
+        self.timeouts = TimeoutPolicy()
+        self.watchdog = ResourceWatchdog(self)
+        self.perf = PerformanceCapture(self)
         self.driver = self.setup_driver()
         self.login()
         self.posts_data = []
@@ -103,6 +109,7 @@ class LinkedInBot:
         chrome_options.add_argument(
             "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         )
+        self.perf.configure_options(chrome_options)
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.execute_script(
@@ -116,9 +123,13 @@ class LinkedInBot:
 
     def login(self):
         """Logs into LinkedIn using credentials from environment variables."""
-        self.driver.get("https://www.linkedin.com/login")
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.ID, "username"))
+        with self.perf.action("login_page"):
+            self.driver.get("https://www.linkedin.com/login")
+        self.timeouts.wait(
+            self.driver,
+            "login.username",
+            EC.presence_of_element_located((By.ID, "username")),
+            default=10,
         )
 
         username_field = self.driver.find_element(By.ID, "username")
@@ -146,8 +157,15 @@ class LinkedInBot:
         self.refresh_page()
 
     def refresh_page(self):
+        # A recycled tab or driver has just reloaded the page, so skip the refresh
+        if self.watchdog.checkpoint("refresh_page"):
+            return
+        if self.driver is None:
+            logging.error("No browser session left; cannot refresh the page.")
+            return
         logging.info("Refreshing the current page.")
-        self.driver.refresh()
+        with self.perf.action("refresh"):
+            self.driver.refresh()
         self.random_delay(2, 5)
 
     def fetch_and_store_content(self):
@@ -197,13 +215,16 @@ class LinkedInBot:
     def comment_on_post(self, post, comment_text):
         logging.info(f"Attempting to comment on post {post['id']}.")
         try:
-            comment_button = WebDriverWait(self.driver, 22).until(
+            comment_button = self.timeouts.wait(
+                self.driver,
+                "comment.comment_button",
                 EC.element_to_be_clickable(
                     (
                         By.XPATH,
                         f"//div[@data-id='{post['id']}']//button[contains(@aria-label, 'Comment')]",
                     )
-                )
+                ),
+                default=22,
             )
             ActionChains(self.driver).move_to_element(
                 comment_button
@@ -211,10 +232,13 @@ class LinkedInBot:
             comment_button.click()
             self.random_delay()
 
-            comment_input = WebDriverWait(self.driver, 22).until(
+            comment_input = self.timeouts.wait(
+                self.driver,
+                "comment.text_box",
                 EC.visibility_of_element_located(
                     (By.XPATH, f"//div[@data-id='{post['id']}']//div[@role='textbox']")
-                )
+                ),
+                default=22,
             )
             self.driver.execute_script(
                 "arguments[0].innerText = arguments[1];",
@@ -223,13 +247,16 @@ class LinkedInBot:
             )
             self.random_delay()
 
-            post_comment_button = WebDriverWait(self.driver, 22).until(
+            post_comment_button = self.timeouts.wait(
+                self.driver,
+                "comment.submit_button",
                 EC.element_to_be_clickable(
                     (
                         By.XPATH,
                         f"//div[@data-id='{post['id']}']//button[contains(@class, 'comments-comment-box__submit-button') and .//span[text()='Post']]",
                     )
-                )
+                ),
+                default=22,
             )
             post_comment_button.click()
             logging.info(f"Comment posted successfully on post {post['id']}.")
@@ -241,13 +268,16 @@ class LinkedInBot:
     def like_post(self, post):
         logging.info(f"Attempting to like post {post['id']}.")
         try:
-            like_button = WebDriverWait(self.driver, 22).until(
+            like_button = self.timeouts.wait(
+                self.driver,
+                "like.like_button",
                 EC.element_to_be_clickable(
                     (
                         By.XPATH,
                         f"//div[@data-id='{post['id']}']//button[contains(@aria-label, 'Like')]",
                     )
-                )
+                ),
+                default=22,
             )
 
             # Scroll to the "Like" button to ensure it's visible
@@ -335,6 +365,10 @@ class LinkedInBot:
                     # else:
                     #     print("Failed to generate a comment.")
                     pass
+            self.watchdog.checkpoint(f"like_post {post['id']}")
+            if self.driver is None:
+                logging.error("No browser session left; stopping interactions.")
+                break
             self.like_post(post)
 
 
@@ -345,5 +379,8 @@ if __name__ == "__main__":
         bot.analyze_and_interact()
         time.sleep(5)
     finally:
-        bot.driver.quit()  # Ensure the driver is quit properly
-        logging.info("Driver session ended cleanly.")
+        bot.timeouts.save()
+        save_run_report({"memory": bot.watchdog.timeline, "trace": bot.perf.save()})
+        if bot.driver is not None:
+            bot.driver.quit()  # Ensure the driver is quit properly
+            logging.info("Driver session ended cleanly.")